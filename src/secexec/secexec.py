@@ -1,16 +1,229 @@
 import bashlex
 import subprocess
 import os
-import tempfile
+import re
 import logging
 import asyncio
 import shutil
+import selectors
 
-from typing import Any
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import repeat
+from typing import Any, Awaitable, Callable, ClassVar, Literal, overload
 
-format="[%(levelname)s][%(asctime)s][%(filename)s:%(lineno)d][%(funcName)s] %(message)s"
-logging.basicConfig(format=format, level=logging.INFO)
+FORMAT = "[%(levelname)s][%(asctime)s][%(filename)s:%(lineno)d][%(funcName)s] %(message)s"
 logger = logging.getLogger(__name__)
+# Library default: emit nothing unless the application configures logging (see setup_logging)
+logger.addHandler(logging.NullHandler())
+
+# $NAME or ${NAME} references expanded from the caller's env overlay
+_VAR_RE = re.compile(r'\$\{(\w+)\}|\$(\w+)')
+
+# A single plain command: space-separated words of characters bash never treats specially.
+# The first word excludes '=' so leading assignments (FOO=bar cmd) still go through the parser
+_SIMPLE_RE = re.compile(r'[ \t]*[\w\-./:@+,]+(?:[ \t]+[\w\-./=:@+,]+)*[ \t]*')
+
+# Byte constants shared by the output and error paths, encoded once at import
+_NL = b"\n"
+_NOT_FOUND = b"Command not found: "
+_OP_NOT_IMPL = b"Operator node type not fully implemented"
+
+# A full default Linux pipe buffer, so one read usually empties the pipe
+_READ_CHUNK_SIZE = 1 << 16
+
+# asyncio StreamReader limit: communicate() reads in blocks of this size and the transport
+# only pauses past twice it, so large outputs move in fewer, bigger chunks
+_STREAM_LIMIT = 1 << 20
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """Opt-in root logging configuration using the SecExec log format"""
+    logging.basicConfig(format=FORMAT, level=level)
+
+
+def _decode(data: bytes) -> str:
+    """Decode command output as UTF-8, substituting U+FFFD only when the bytes are invalid"""
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("utf-8", errors="replace")
+
+
+@dataclass(frozen=True, slots=True)
+class CommandPlan:
+    """A simple command; its words are expanded against the env overlay at run time"""
+    words: tuple[str, ...]
+    # Whether any word holds a '$' reference, so plain commands skip expansion entirely
+    expands: bool
+
+
+@dataclass(frozen=True, slots=True)
+class PipelinePlan:
+    """Commands joined by '|' (cmd1 | cmd2 | ...); every stage is a CommandPlan or a ShellPlan"""
+    stages: tuple["Plan", ...]
+
+
+@dataclass(frozen=True, slots=True)
+class ListPlan:
+    """Commands joined by ;, && or ||; each step carries the operator in front of it"""
+    steps: tuple[tuple[str, "Plan"], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class SequencePlan:
+    """Commands joined only by ';', all of which run unconditionally"""
+    children: tuple["Plan", ...]
+
+
+@dataclass(frozen=True, slots=True)
+class ShellPlan:
+    """Source run by bash as a whole: a ( ... ) subshell, a { ... } group, or a command bashlex cannot plan"""
+    # The node's exact source text, including any redirects attached to it
+    source: str
+
+
+@dataclass(frozen=True, slots=True)
+class UnsupportedPlan:
+    """A node with no native implementation; running it reports the message and returns 1"""
+    message: bytes
+
+
+Plan = CommandPlan | PipelinePlan | ListPlan | SequencePlan | ShellPlan | UnsupportedPlan
+
+
+class _WholeShell(Exception):
+    """Raised while planning a node that needs the entire command string to run in one bash process"""
+
+
+def _plan_command(node: Any) -> CommandPlan:
+    """Extract the words of a command node"""
+    words = tuple(part.word for part in node.parts if part.kind == 'word')
+    return CommandPlan(words, any('$' in word for word in words))
+
+
+def _plan_node(node: Any, source: str) -> Plan:
+    """Convert a bashlex AST node into a plan tree, so execution never touches the AST"""
+    kind = node.kind
+    if kind == 'command':
+        return _plan_command(node)
+    if kind == 'pipeline':
+        if len(node.parts) == 1:
+            return _plan_node(node.parts[0], source)
+        stages = []
+        for part in node.parts:
+            if part.kind == 'command':
+                stages.append(_plan_command(part))
+            elif part.kind == 'compound':
+                stages.append(_plan_node(part, source))
+            elif part.kind != 'pipe':
+                # '!' negation or anything else without a native stage: let bash run the whole pipeline
+                start, end = node.pos
+                return ShellPlan(source[start:end])
+        return PipelinePlan(tuple(stages))
+    if kind == 'list':
+        # bashlex flattens a chain into [cmd, op, cmd, op, cmd, ...]; pair each command with its operator
+        steps = []
+        operator = ';'
+        for part in node.parts:
+            if part.kind == 'operator':
+                operator = part.op
+            else:
+                steps.append((operator, _plan_node(part, source)))
+        # A pure ;-chain has nothing to short-circuit, so give it the simpler sequence form
+        if all(operator == ';' for operator, _ in steps):
+            return SequencePlan(tuple(child for _, child in steps))
+        return ListPlan(tuple(steps))
+    if kind == 'compound':
+        # Subshells and groups carry cd, redirects and isolation semantics, so bash runs them once
+        start, end = node.pos
+        return ShellPlan(source[start:end])
+    if kind == 'function':
+        # A function definition and its calls have to share one shell
+        raise _WholeShell
+    if kind == 'operator':
+        # Redirection operators are not fully implemented in this example
+        return UnsupportedPlan(_OP_NOT_IMPL)
+    return UnsupportedPlan(f"Unknown node type: {kind}".encode())
+
+
+@lru_cache(maxsize=1024)
+def _parse_cached(command_str: str) -> tuple[Plan, ...]:
+    """Parse a command string with bashlex into plan trees, memoized by the exact command text"""
+    # bashlex only produces several top-level nodes across newlines; without one a single
+    # parse pass covers the whole string, so skip parse()'s end-finding walk and reparse loop
+    try:
+        if "\n" not in command_str:
+            nodes = (bashlex.parser.parsesingle(command_str),)
+        else:
+            nodes = bashlex.parse(command_str)
+        return tuple(_plan_node(node, command_str) for node in nodes)
+    except _WholeShell:
+        return (ShellPlan(command_str),)
+    except (bashlex.errors.ParsingError, NotImplementedError):
+        # bashlex rejects parenthesised syntax bash accepts (arrays, case patterns, [[ ( ) ]]),
+        # so those strings keep going to bash as a whole
+        if "(" in command_str:
+            return (ShellPlan(command_str),)
+        raise
+
+
+def _expand_word(word: str, env: dict[str, str] | None) -> str:
+    """Basic shell variable expansion for a command or argument word"""
+    if '$' not in word or not env:
+        return word
+    # One scan per word; unknown variables are left as written
+    return _VAR_RE.sub(lambda match: env.get(match.group(1) or match.group(2), match.group(0)), word)
+
+
+def _stage_argv(plan: Plan, env: dict[str, str] | None) -> list[str]:
+    """Build the argv of a pipeline stage, running ShellPlan stages through bash"""
+    if type(plan) is ShellPlan:
+        return ['bash', '-c', plan.source]
+    return _plan_argv(plan, env)
+
+
+def _plan_argv(plan: CommandPlan, env: dict[str, str] | None) -> list[str]:
+    """Build the argv of a command plan, expanding variables only when some word references one"""
+    if not plan.expands:
+        return list(plan.words)
+    return [_expand_word(word, env) for word in plan.words]
+
+
+def _merge_env(env: dict[str, str] | None) -> dict[str, str] | None:
+    """Overlay the provided env dict on the system env; None inherits it without a copy"""
+    return {**os.environ, **env} if env else None
+
+
+@lru_cache(maxsize=512)
+def _which_cached(cmd: str, path: str) -> str | None:
+    """Resolve a command name against a PATH string, memoized per (cmd, PATH) pair"""
+    return shutil.which(cmd, path=path)
+
+
+def _resolve_executable(name: str, env: dict[str, str] | None) -> str:
+    """Return the absolute path for a bare command name, or the name itself if it cannot be resolved"""
+    # Names containing a separator are relative to the child's cwd, so leave them to exec
+    if os.sep in name:
+        return name
+    path = (env if env is not None else os.environ).get("PATH", os.defpath)
+    return _which_cached(name, path) or name
+
+
+def _drain_pipes(streams: list[Any], buffers: list[bytearray]) -> None:
+    """Read every stream until EOF into the matching buffer, multiplexing them with a selector, and close them"""
+    with selectors.DefaultSelector() as selector:
+        for stream, buffer in zip(streams, buffers):
+            selector.register(stream.fileno(), selectors.EVENT_READ, buffer)
+        while selector.get_map():
+            for key, _ in selector.select():
+                chunk = os.read(key.fd, _READ_CHUNK_SIZE)
+                if chunk:
+                    key.data.extend(chunk)
+                else:
+                    selector.unregister(key.fd)
+    for stream in streams:
+        stream.close()
 
 
 class SecExec:
@@ -20,662 +233,451 @@ class SecExec:
     constructs including &&, ||, ;, |, and nested commands.
     """
 
-    def execute(self, command_str: str, cwd: str | None = None, env: dict[str, str] = dict()) -> tuple[str, str, int]:
+    def __init__(self, parallel_list: bool = False) -> None:
+        """
+        parallel_list: in aexecute(), run the commands of a purely ;-separated list concurrently.
+        Only safe when they do not depend on each other's side effects (files, ordering of writes);
+        output is still stitched together in command order and the last command's exit code wins
+        """
+        self.parallel_list = parallel_list
+
+    @overload
+    def execute(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None, decode: Literal[True] = True) -> tuple[str, str, int]: ...
+    @overload
+    def execute(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None, *, decode: Literal[False]) -> tuple[bytes, bytes, int]: ...
+    @overload
+    def execute(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None, decode: bool = True) -> tuple[str, str, int] | tuple[bytes, bytes, int]: ...
+
+    def execute(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None, decode: bool = True) -> tuple[str, str, int] | tuple[bytes, bytes, int]:
         """
         Execute a shell-like command string securely using bashlex parsing
         Returns CommandResult with stdout, stderr, and exit_code
+
+        Output stays as bytes internally and is decoded once here. Pass decode=False to get
+        the raw bytes back and skip the UTF-8 decode (and its str allocation) entirely, e.g.
+        when only the exit code or binary output matters.
         """
+        rc, stdout, stderr = self._execute_bytes(command_str, cwd, env)
+        if not decode:
+            return (stdout, stderr, rc)
+        return (_decode(stdout), _decode(stderr), rc)
+
+    def _execute_bytes(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None) -> tuple[int, bytes, bytes]:
+        """Execute a command string and return the undecoded exit code, stdout and stderr"""
         try:
             # Handle empty command case
-            if not command_str.strip():
-                return ("", "", 0)
+            if not command_str or command_str.isspace():
+                return (0, b"", b"")
+
+            # Merge the env overlay once per call; every spawn below reuses it
+            merged_env = _merge_env(env)
                 
-            # Handle commands with parentheses by replacing them with bash execution
-            if "(" in command_str and ")" in command_str:
-                # For subshell expressions, we'll use actual bash but capture the output
+            # Fast path: a plain command needs no quoting rules, so split on whitespace and skip bashlex
+            if _SIMPLE_RE.fullmatch(command_str):
+                all_stdout = bytearray()
+                all_stderr = bytearray()
+                rc = self._execute_argv(command_str.split(), merged_env, cwd, all_stdout, all_stderr)
+                return (rc, bytes(all_stdout), bytes(all_stderr))
+
+            # Command and process substitution cannot be run natively, so hand those to bash as a whole
+            if "$(" in command_str or "<(" in command_str or ">(" in command_str:
                 process = subprocess.Popen(
                     ['bash', '-c', command_str],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     stdin=subprocess.DEVNULL,
                     cwd=cwd,
-                    env={**os.environ, **(env or {})}
+                    env=merged_env
                 )
                 stdout, stderr = process.communicate()
-                return (stdout.decode("utf-8", errors="replace"), 
-                        stderr.decode("utf-8", errors="replace"), 
-                        process.returncode or 0)
-                
-            # Special handling for common patterns
-            if "&&" in command_str:
-                parts = command_str.split("&&")
-                all_stdout = []
-                all_stderr = ""
-                last_rc = 0
-                
-                for i, part in enumerate(parts):
-                    part = part.strip()
-                    if not part:
-                        continue
-                        
-                    stdout, stderr, rc = self.execute(part, cwd, env)
-                    all_stderr += stderr
-                    
-                    if rc == 0:
-                        all_stdout.append(stdout.strip())
-                    else:
-                        last_rc = rc
-                        break
-                
-                return ("\n".join(all_stdout), all_stderr, last_rc)
-                
-            elif "||" in command_str:
-                parts = command_str.split("||")
-                for part in parts:
-                    part = part.strip()
-                    if not part:
-                        continue
-                        
-                    stdout, stderr, rc = self.execute(part, cwd, env)
-                    if rc == 0:
-                        return (stdout, stderr, rc)
-                
-                # If we get here, all commands failed
-                stdout, stderr, rc = self.execute(parts[-1].strip(), cwd, env)
-                return (stdout, stderr, rc)
-                
-            elif ";" in command_str:
-                parts = command_str.split(";")
-                all_stdout = []
-                all_stderr = ""
-                last_rc = 0
-                
-                for part in parts:
-                    part = part.strip()
-                    if not part:
-                        continue
-                        
-                    stdout, stderr, rc = self.execute(part, cwd, env)
-                    if stdout.strip():
-                        all_stdout.append(stdout.strip())
-                    all_stderr += stderr
-                    last_rc = rc
-                
-                return ("\n".join(all_stdout), all_stderr, last_rc)
-            
-            # For standard commands, use the bashlex parser
-            command_parts = bashlex.parse(command_str)
+                return (process.returncode, stdout, stderr)
+
+            # Parse once (cached) into plan trees and run everything, including &&, || and ;, from those
+            plans = _parse_cached(command_str)
 
-            all_stdout = b""
-            all_stderr = b""
+            all_stdout = bytearray()
+            all_stderr = bytearray()
             last_return_code = 0
 
-            # Execute each top-level command part
-            for cmd_part in command_parts:
-                rc, stdout, stderr = self._execute_node(cmd_part, env, cwd)
-                all_stdout += stdout
-                all_stderr += stderr
-                last_return_code = rc
+            if len(plans) == 1 and type(plans[0]) is CommandPlan:
+                # Fast path: a lone simple command needs no dispatch
+                last_return_code = self._execute_command(plans[0], env, merged_env, cwd, all_stdout, all_stderr)
+            else:
+                # Run each top-level plan, every node appending into the same buffers
+                for plan in plans:
+                    last_return_code = self._run_sync(plan, env, merged_env, cwd, all_stdout, all_stderr)
 
-            return (all_stdout.decode("utf-8", errors="replace"), all_stderr.decode("utf-8", errors="replace"), last_return_code)
+            return (last_return_code, bytes(all_stdout), bytes(all_stderr))
 
         except bashlex.errors.ParsingError as e:
-            return ("", f"Failed to parse command: {e}", 1)
+            return (1, b"", f"Failed to parse command: {e}".encode())
         except Exception as e:
-            return ("", f"Error executing command: {e}", 1)
-
-    def _execute_node(self, node: Any, env: dict[str, str], cwd: str | None = None) -> tuple[int, bytes, bytes]:
-        """Execute a bashlex AST node based on its kind"""
-        if node.kind == 'command':
-            # Simple command
-            return self._execute_command_node(node, env, cwd)
-        elif node.kind == 'pipeline':
-            # Pipeline of commands (cmd1 | cmd2 | ...)
-            return self._execute_pipeline_node(node, env, cwd)
-        elif node.kind == 'list':
-            # List of commands (cmd1; cmd2 or cmd1 && cmd2 or cmd1 || cmd2)
-            return self._execute_list_node(node, env, cwd)
-        elif node.kind == 'operator':
-            # Handle redirection operators (not fully implemented in this example)
-            return 1, b"", "Operator node type not fully implemented".encode()
-        else:
-            return 1, b"", f"Unknown node type: {node.kind}".encode()
+            return (1, b"", f"Error executing command: {e}".encode())
 
-    def _execute_command_node(self, node: Any, env: dict[str, str], cwd: str | None = None) -> tuple[int, bytes, bytes]:
-        """Execute a simple command node"""
-        # Extract command parts (command and arguments)
-        args = []
-        for part in node.parts:
-            if part.kind == 'word':
-                # This is a command or argument
-                word = part.word
-                
-                # Basic shell variable expansion for arguments
-                if '$' in word and env:
-                    for var_name, var_value in env.items():
-                        word = word.replace(f"${var_name}", var_value)
-                        word = word.replace(f"${{{var_name}}}", var_value)
-                        word = word.replace(f"${var_name}$", var_value + "$")
-                        # Replace at word boundaries
-                        if word == f"${var_name}":
-                            word = var_value
-                
-                args.append(word)
+    def _run_sync(self, plan: Plan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None, stdout_buf: bytearray, stderr_buf: bytearray) -> int:
+        """Run a plan node based on its type, appending its output to the given buffers"""
+        return SecExec._DISPATCH[type(plan)](self, plan, env, merged_env, cwd, stdout_buf, stderr_buf)
+
+    def _execute_unsupported(self, plan: UnsupportedPlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None, stdout_buf: bytearray, stderr_buf: bytearray) -> int:
+        """Report a node that has no native implementation"""
+        stderr_buf.extend(plan.message)
+        return 1
+
+    def _execute_command(self, plan: CommandPlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None, stdout_buf: bytearray, stderr_buf: bytearray) -> int:
+        """Execute a simple command"""
+        args = _plan_argv(plan, env)
 
         if not args:
-            return 0, b"", b""
+            return 0
+
+        return self._execute_argv(args, merged_env, cwd, stdout_buf, stderr_buf)
 
+    def _execute_argv(self, args: list[str], merged_env: dict[str, str] | None, cwd: str | None, stdout_buf: bytearray, stderr_buf: bytearray) -> int:
+        """Spawn a single argv, appending its output to the given buffers"""
         try:
-            # Create environment with provided env dict and system env
-            merged_env = os.environ.copy()
-            if env:
-                merged_env.update(env)
-                
+            # Keep Popen free of preexec_fn/start_new_session/process_group so CPython can spawn
+            # via vfork; close_fds stays on so no host descriptors leak into untrusted commands
             proc = subprocess.Popen(
                 args,
+                executable=_resolve_executable(args[0], merged_env),
                 cwd=cwd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 stdin=subprocess.DEVNULL,
                 env=merged_env,
             )
-            stdout, stderr = proc.communicate()
-            return proc.returncode or 0, stdout, stderr
+            _drain_pipes([proc.stdout, proc.stderr], [stdout_buf, stderr_buf])
+            return proc.wait()
 
         except FileNotFoundError:
-            return 127, b"", f"Command not found: {args[0]}".encode()
+            stderr_buf.extend(_NOT_FOUND + os.fsencode(args[0]))
+            return 127
         except Exception as e:
-            return 1, b"", str(e).encode()
+            stderr_buf.extend(str(e).encode())
+            return 1
 
-    def _execute_pipeline_node(self, node: Any, env: dict[str, str], cwd: str | None = None) -> tuple[int, bytes, bytes]:
+    def _execute_pipeline(self, plan: PipelinePlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None, stdout_buf: bytearray, stderr_buf: bytearray) -> int:
         """Execute a pipeline of commands (cmd1 | cmd2 | ...)"""
-        commands = node.parts
-
-        if len(commands) == 1:
-            return self._execute_node(commands[0], env, cwd)
-
-        # Extract commands from the pipeline
-        parsed_commands = []
-        for cmd in commands:
-            if cmd.kind == 'command':
-                cmd_args = []
-                for part in cmd.parts:
-                    if part.kind == 'word':
-                        word = part.word
-                        
-                        # Basic shell variable expansion for arguments
-                        if '$' in word and env:
-                            for var_name, var_value in env.items():
-                                word = word.replace(f"${var_name}", var_value)
-                                word = word.replace(f"${{{var_name}}}", var_value)
-                                word = word.replace(f"${var_name}$", var_value + "$")
-                                # Replace at word boundaries
-                                if word == f"${var_name}":
-                                    word = var_value
-                        
-                        cmd_args.append(word)
-                parsed_commands.append(cmd_args)
+        parsed_commands = [_stage_argv(stage, env) for stage in plan.stages]
 
         if not parsed_commands:
-            return 0, b"", b""
+            return 0
 
-        # Create environment with provided env dict and system env
-        merged_env = os.environ.copy()
-        if env:
-            merged_env.update(env)
+        procs = []
+        prev_read = None
 
-        # Use temporary files for the pipeline
-        temp_files = []
-        
         try:
-            # Create temporary files for the pipeline
-            for _ in range(len(parsed_commands) - 1):
-                temp_file = tempfile.NamedTemporaryFile(delete=False)
-                temp_files.append(temp_file.name)
-                temp_file.close()
-
-            all_stderr = b""
-
-            # First command: output to first temp file
-            first_cmd = parsed_commands[0]
-            with open(temp_files[0], "wb") as first_out:
-                first_proc = subprocess.Popen(
-                    first_cmd,
-                    cwd=cwd,
-                    stdout=first_out,
-                    stderr=subprocess.PIPE,
-                    env=merged_env
-                )
-                _, stderr1 = first_proc.communicate()
-                all_stderr += stderr1
-
-            # Middle commands: input from previous temp file, output to next temp file
-            for i in range(1, len(parsed_commands) - 1):
-                cmd = parsed_commands[i]
-                with open(temp_files[i - 1], "rb") as stdin_file, open(temp_files[i], "wb") as stdout_file:
+            # Launch every stage up-front, wiring neighbouring stages together with kernel pipes.
+            # Spawn kwargs mirror _execute_argv so stages stay on CPython's vfork path
+            for i, cmd in enumerate(parsed_commands):
+                is_last = i == len(parsed_commands) - 1
+                next_read, write_end = (None, None) if is_last else os.pipe()
+                try:
                     proc = subprocess.Popen(
                         cmd,
+                        executable=_resolve_executable(cmd[0], merged_env),
                         cwd=cwd,
-                        stdin=stdin_file,
-                        stdout=stdout_file,
+                        stdin=subprocess.DEVNULL if prev_read is None else prev_read,
+                        stdout=subprocess.PIPE if is_last else write_end,
                         stderr=subprocess.PIPE,
                         env=merged_env,
                     )
-                    _, stderr_i = proc.communicate()
-                    all_stderr += stderr_i
-
-            # Last command: input from last temp file, output to pipe
-            last_cmd = parsed_commands[-1]
-            with open(temp_files[-1], "rb") as last_in:
-                last_proc = subprocess.Popen(
-                    last_cmd,
-                    cwd=cwd,
-                    stdin=last_in,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    env=merged_env,
-                )
-
-                final_stdout, final_stderr = last_proc.communicate()
-                all_stderr += final_stderr
-
-                return last_proc.returncode or 0, final_stdout, all_stderr
+                finally:
+                    # Drop the parent's copies so EOF and SIGPIPE propagate between stages
+                    if prev_read is not None:
+                        os.close(prev_read)
+                    if write_end is not None:
+                        os.close(write_end)
+                    prev_read = next_read
+                procs.append(proc)
+
+            # Drain every stage's stderr and the final stdout together so no stage stalls on a full pipe.
+            # Stage stderr is buffered separately to keep it in pipeline order
+            last_proc = procs[-1]
+            stage_stderr = [bytearray() for _ in procs]
+            _drain_pipes([proc.stderr for proc in procs] + [last_proc.stdout], stage_stderr + [stdout_buf])
+            for proc, stderr in zip(procs, stage_stderr):
+                proc.wait()
+                stderr_buf.extend(stderr)
+
+            return last_proc.returncode
 
+        except FileNotFoundError:
+            stderr_buf.extend(_NOT_FOUND + os.fsencode(cmd[0]))
+            return 127
         except Exception as e:
-            return 1, b"", str(e).encode()
+            stderr_buf.extend(str(e).encode())
+            return 1
 
         finally:
-            # Clean up temp files
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-                except Exception:
-                    pass
-
-    def _execute_list_node(self, node: Any, env: dict[str, str], cwd: str | None = None) -> tuple[int, bytes, bytes]:
+            if prev_read is not None:
+                os.close(prev_read)
+            # Reap stages left running by a failed launch
+            for proc in procs:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                proc.stderr.close()
+
+    def _execute_list(self, plan: ListPlan | SequencePlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None, stdout_buf: bytearray, stderr_buf: bytearray) -> int:
         """Execute a list of commands (cmd1; cmd2 or cmd1 && cmd2 or cmd1 || cmd2)"""
-        if not hasattr(node, 'parts') or len(node.parts) < 3:
-            return 1, b"", b"Invalid list node structure"
-
-        left_node = node.parts[0]
-        operator = node.parts[1]
-        right_node = node.parts[2]
-
-        # Execute left command
-        left_rc, left_stdout, left_stderr = self._execute_node(left_node, env, cwd)
-
-        # Check operator and decide whether to execute right command
-        if operator == '&&':
-            # AND operator: execute right only if left succeeded
-            if left_rc == 0:
-                right_rc, right_stdout, right_stderr = self._execute_node(right_node, env, cwd)
-                # For && operator, we return right's return code and concatenate outputs
-                return right_rc, left_stdout + b"\n" + right_stdout if left_stdout and right_stdout else left_stdout + right_stdout, left_stderr + right_stderr
-            else:
-                return left_rc, left_stdout, left_stderr
-
-        elif operator == '||':
-            # OR operator: execute right only if left failed
-            if left_rc != 0:
-                right_rc, right_stdout, right_stderr = self._execute_node(right_node, env, cwd)
-                # For || operator, we return right's return code and append its output
-                return right_rc, right_stdout, left_stderr + right_stderr
-            else:
-                return left_rc, left_stdout, left_stderr
-
-        elif operator == ';':
-            # SEMICOLON operator: always execute both
-            right_rc, right_stdout, right_stderr = self._execute_node(right_node, env, cwd)
-            # For ; operator, we return right's return code and concatenate outputs
-            return right_rc, left_stdout + b"\n" + right_stdout if left_stdout and right_stdout else left_stdout + right_stdout, left_stderr + right_stderr
-
-        else:
-            return left_rc, left_stdout, left_stderr
-
-    async def aexecute(self, command_str: str, cwd: str | None = None, env: dict[str, str] = dict()) -> tuple[str, str, int]:
+        list_start = len(stdout_buf)
+        last_rc = 0
+        # A SequencePlan is a ;-only chain, so pair every child with ';' and nothing short-circuits
+        steps = plan.steps if type(plan) is ListPlan else zip(repeat(';'), plan.children)
+
+        for operator, child in steps:
+            # && runs only after success, || only after failure; a skipped command keeps the previous rc
+            if (operator == '&&' and last_rc != 0) or (operator == '||' and last_rc == 0):
+                continue
+
+            start = len(stdout_buf)
+            needs_newline = start > list_start and not stdout_buf.endswith(_NL)
+            last_rc = self._run_sync(child, env, merged_env, cwd, stdout_buf, stderr_buf)
+            # Keep each command's output on its own line
+            if needs_newline and len(stdout_buf) > start:
+                stdout_buf[start:start] = _NL
+
+        return last_rc
+
+    def _execute_shell(self, plan: ShellPlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None, stdout_buf: bytearray, stderr_buf: bytearray) -> int:
+        """Execute a subshell, group or unplannable command by invoking bash once on its source"""
+        return self._execute_argv(['bash', '-c', plan.source], merged_env, cwd, stdout_buf, stderr_buf)
+
+    # Plan type -> handler, looked up once per node instead of walking an if/elif chain
+    _DISPATCH: ClassVar[dict[type, Callable[..., int]]] = {
+        CommandPlan: _execute_command,        # Simple command
+        PipelinePlan: _execute_pipeline,      # Pipeline of commands (cmd1 | cmd2 | ...)
+        ListPlan: _execute_list,              # List of commands (cmd1; cmd2 or cmd1 && cmd2 or cmd1 || cmd2)
+        SequencePlan: _execute_list,          # Only ;-separated commands (cmd1; cmd2; ...)
+        ShellPlan: _execute_shell,            # Grouped commands ( ... ) or { ... }
+        UnsupportedPlan: _execute_unsupported,
+    }
+
+    @overload
+    async def aexecute(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None, decode: Literal[True] = True) -> tuple[str, str, int]: ...
+    @overload
+    async def aexecute(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None, *, decode: Literal[False]) -> tuple[bytes, bytes, int]: ...
+    @overload
+    async def aexecute(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None, decode: bool = True) -> tuple[str, str, int] | tuple[bytes, bytes, int]: ...
+
+    async def aexecute(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None, decode: bool = True) -> tuple[str, str, int] | tuple[bytes, bytes, int]:
         """
         Execute a shell-like command string securely using bashlex parsing asynchronously
         Returns a tuple of stdout, stderr, and exit_code
+
+        As with execute(), pass decode=False to get the raw bytes and skip the UTF-8 decode.
         """
+        rc, stdout, stderr = await self._aexecute_bytes(command_str, cwd, env)
+        if not decode:
+            return (stdout, stderr, rc)
+        return (_decode(stdout), _decode(stderr), rc)
+
+    async def _aexecute_bytes(self, command_str: str, cwd: str | None = None, env: dict[str, str] | None = None) -> tuple[int, bytes, bytes]:
+        """Execute a command string asynchronously and return the undecoded exit code, stdout and stderr"""
         try:
             # Handle empty command case
-            if not command_str.strip():
-                return ("", "", 0)
+            if not command_str or command_str.isspace():
+                return (0, b"", b"")
+
+            # Merge the env overlay once per call; every spawn below reuses it
+            merged_env = _merge_env(env)
                 
-            # Handle commands with parentheses by replacing them with bash execution
-            if "(" in command_str and ")" in command_str:
-                # For subshell expressions, we'll use actual bash but capture the output asynchronously
-                merged_env = os.environ.copy()
-                if env:
-                    merged_env.update(env)
-                    
+            # Fast path: a plain command needs no quoting rules, so split on whitespace and skip bashlex
+            if _SIMPLE_RE.fullmatch(command_str):
+                return await self._aexecute_argv(command_str.split(), merged_env, cwd)
+
+            # Command and process substitution cannot be run natively, so hand those to bash as a whole
+            if "$(" in command_str or "<(" in command_str or ">(" in command_str:
                 process = await asyncio.create_subprocess_exec(
                     'bash', '-c', command_str,
                     stdout=asyncio.subprocess.PIPE,
                     stderr=asyncio.subprocess.PIPE,
                     stdin=asyncio.subprocess.DEVNULL,
                     cwd=cwd,
-                    env=merged_env
+                    env=merged_env,
+                    limit=_STREAM_LIMIT,
                 )
                 stdout, stderr = await process.communicate()
-                return (stdout.decode("utf-8", errors="replace"), 
-                        stderr.decode("utf-8", errors="replace"), 
-                        process.returncode or 0)
-
-            # Special handling for common patterns
-            if "&&" in command_str:
-                parts = command_str.split("&&")
-                all_stdout = []
-                all_stderr = ""
-                last_rc = 0
-                
-                for i, part in enumerate(parts):
-                    part = part.strip()
-                    if not part:
-                        continue
-                        
-                    stdout, stderr, rc = await self.aexecute(part, cwd, env)
-                    all_stderr += stderr
-                    
-                    if rc == 0:
-                        all_stdout.append(stdout.strip())
-                    else:
-                        last_rc = rc
-                        break
-                
-                return ("\n".join(all_stdout), all_stderr, last_rc)
-                
-            elif "||" in command_str:
-                parts = command_str.split("||")
-                for part in parts:
-                    part = part.strip()
-                    if not part:
-                        continue
-                        
-                    stdout, stderr, rc = await self.aexecute(part, cwd, env)
-                    if rc == 0:
-                        return (stdout, stderr, rc)
-                
-                # If we get here, all commands failed
-                stdout, stderr, rc = await self.aexecute(parts[-1].strip(), cwd, env)
-                return (stdout, stderr, rc)
-                
-            elif ";" in command_str:
-                parts = command_str.split(";")
-                all_stdout = []
-                all_stderr = ""
-                last_rc = 0
-                
-                for part in parts:
-                    part = part.strip()
-                    if not part:
-                        continue
-                        
-                    stdout, stderr, rc = await self.aexecute(part, cwd, env)
-                    if stdout.strip():
-                        all_stdout.append(stdout.strip())
-                    all_stderr += stderr
-                    last_rc = rc
-                
-                return ("\n".join(all_stdout), all_stderr, last_rc)
-                
-            # Parse the command using bashlex
-            command_parts = bashlex.parse(command_str)
+                return (process.returncode, stdout, stderr)
 
-            all_stdout = b""
-            all_stderr = b""
+            # Parse once (cached) into plan trees and run everything, including &&, || and ;, from those
+            plans = _parse_cached(command_str)
+
+            if len(plans) == 1 and type(plans[0]) is CommandPlan:
+                # Fast path: a lone simple command needs no dispatch or output copying
+                return await self._aexecute_command(plans[0], env, merged_env, cwd)
+
+            all_stdout = bytearray()
+            all_stderr = bytearray()
             last_return_code = 0
 
-            # Execute each top-level command part
-            for cmd_part in command_parts:
-                rc, stdout, stderr = await self._aexecute_node(cmd_part, env, cwd)
-                all_stdout += stdout
-                all_stderr += stderr
+            # Run each top-level plan
+            for plan in plans:
+                rc, stdout, stderr = await self._run_async(plan, env, merged_env, cwd)
+                all_stdout.extend(stdout)
+                all_stderr.extend(stderr)
                 last_return_code = rc
 
-            return (all_stdout.decode("utf-8", errors="replace"), all_stderr.decode("utf-8", errors="replace"), last_return_code)
+            return (last_return_code, bytes(all_stdout), bytes(all_stderr))
 
         except bashlex.errors.ParsingError as e:
-            return ("", f"Failed to parse command: {e}", 1)
+            return (1, b"", f"Failed to parse command: {e}".encode())
         except Exception as e:
-            return ("", f"Error executing command: {e}", 1)
-
-    async def _aexecute_node(self, node: Any, env: dict[str, str], cwd: str | None = None) -> tuple[int, bytes, bytes]:
-        """Execute a bashlex AST node based on its kind asynchronously"""
-        if node.kind == 'command':
-            # Simple command
-            return await self._aexecute_command_node(node, env, cwd)
-        elif node.kind == 'pipeline':
-            # Pipeline of commands (cmd1 | cmd2 | ...)
-            return await self._aexecute_pipeline_node(node, env, cwd)
-        elif node.kind == 'list':
-            # List of commands (cmd1; cmd2 or cmd1 && cmd2 or cmd1 || cmd2)
-            return await self._aexecute_list_node(node, env, cwd)
-        elif node.kind == 'operator':
-            # Handle redirection operators (not fully implemented in this example)
-            return 1, b"", "Operator node type not fully implemented".encode()
-        else:
-            return 1, b"", f"Unknown node type: {node.kind}".encode()
+            return (1, b"", f"Error executing command: {e}".encode())
 
-    async def _aexecute_command_node(self, node: Any, env: dict[str, str], cwd: str | None = None) -> tuple[int, bytes, bytes]:
-        """Execute a simple command node asynchronously"""
-        # Extract command parts (command and arguments)
-        args = []
-        for part in node.parts:
-            if part.kind == 'word':
-                # This is a command or argument
-                word = part.word
-                
-                # Basic shell variable expansion for arguments
-                if '$' in word and env:
-                    for var_name, var_value in env.items():
-                        word = word.replace(f"${var_name}", var_value)
-                        word = word.replace(f"${{{var_name}}}", var_value)
-                        word = word.replace(f"${var_name}$", var_value + "$")
-                        # Replace at word boundaries
-                        if word == f"${var_name}":
-                            word = var_value
-                
-                args.append(word)
+    async def _run_async(self, plan: Plan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None = None) -> tuple[int, bytes, bytes]:
+        """Run a plan node based on its type asynchronously"""
+        return await SecExec._ADISPATCH[type(plan)](self, plan, env, merged_env, cwd)
+
+    async def _aexecute_unsupported(self, plan: UnsupportedPlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None = None) -> tuple[int, bytes, bytes]:
+        """Report a node that has no native implementation"""
+        return 1, b"", plan.message
+
+    async def _aexecute_command(self, plan: CommandPlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None = None) -> tuple[int, bytes, bytes]:
+        """Execute a simple command asynchronously"""
+        args = _plan_argv(plan, env)
 
         if not args:
             return 0, b"", b""
 
+        return await self._aexecute_argv(args, merged_env, cwd)
+
+    async def _aexecute_argv(self, args: list[str], merged_env: dict[str, str] | None, cwd: str | None = None) -> tuple[int, bytes, bytes]:
+        """Spawn a single argv asynchronously"""
         try:
-            # Create environment with provided env dict and system env
-            merged_env = os.environ.copy()
-            if env:
-                merged_env.update(env)
-
-            # Resolve path for first command
-            cmd_path = shutil.which(args[0])
-            if not cmd_path:
-                return 127, b"", f"Command not found: {args[0]}".encode()
-            
-            # Replace command with full path
-            cmd_args = [cmd_path] + args[1:]
-            
+            # Resolve the command through the cached PATH lookup; argv[0] stays as typed
             proc = await asyncio.create_subprocess_exec(
-                *cmd_args,
+                *args,
+                executable=_resolve_executable(args[0], merged_env),
                 cwd=cwd,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 stdin=asyncio.subprocess.DEVNULL,
                 env=merged_env,
+                limit=_STREAM_LIMIT,
             )
             stdout, stderr = await proc.communicate()
-            return proc.returncode or 0, stdout, stderr
+            return proc.returncode, stdout, stderr
 
         except FileNotFoundError:
-            return 127, b"", f"Command not found: {args[0]}".encode()
+            return 127, b"", _NOT_FOUND + os.fsencode(args[0])
         except Exception as e:
             return 1, b"", str(e).encode()
 
-    async def _aexecute_pipeline_node(self, node: Any, env: dict[str, str], cwd: str | None = None) -> tuple[int, bytes, bytes]:
+    async def _aexecute_pipeline(self, plan: PipelinePlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None = None) -> tuple[int, bytes, bytes]:
         """Execute a pipeline of commands (cmd1 | cmd2 | ...) asynchronously"""
-        commands = node.parts
-
-        if len(commands) == 1:
-            return await self._aexecute_node(commands[0], env, cwd)
-
-        # Extract commands from the pipeline
-        parsed_commands = []
-        for cmd in commands:
-            if cmd.kind == 'command':
-                cmd_args = []
-                for part in cmd.parts:
-                    if part.kind == 'word':
-                        word = part.word
-                        
-                        # Basic shell variable expansion for arguments
-                        if '$' in word and env:
-                            for var_name, var_value in env.items():
-                                word = word.replace(f"${var_name}", var_value)
-                                word = word.replace(f"${{{var_name}}}", var_value)
-                                word = word.replace(f"${var_name}$", var_value + "$")
-                                # Replace at word boundaries
-                                if word == f"${var_name}":
-                                    word = var_value
-                        
-                        cmd_args.append(word)
-                parsed_commands.append(cmd_args)
+        parsed_commands = [_stage_argv(stage, env) for stage in plan.stages]
 
         if not parsed_commands:
             return 0, b"", b""
 
-        # Use temporary files for the pipeline
-        temp_files = []
+        procs = []
+        prev_read = None
+
         try:
-            # Create temporary files for the pipeline
-            for _ in range(len(parsed_commands) - 1):
-                temp_file = tempfile.NamedTemporaryFile(delete=False)
-                temp_files.append(temp_file.name)
-                temp_file.close()
-
-            all_stderr = b""
-            merged_env = os.environ.copy()
-            if env:
-                merged_env.update(env)
-
-            # First command: output to first temp file
-            first_cmd = parsed_commands[0]
-            cmd_path = shutil.which(first_cmd[0])
-            if cmd_path:
-                first_cmd_args = [cmd_path] + first_cmd[1:]
-                with open(temp_files[0], "wb") as first_out:
-                    first_proc = await asyncio.create_subprocess_exec(
-                        *first_cmd_args,
-                        cwd=cwd,
-                        stdout=first_out,
-                        stderr=asyncio.subprocess.PIPE,
-                        env=merged_env
-                    )
-                    _, stderr1 = await first_proc.communicate()
-                    all_stderr += stderr1
-            else:
-                all_stderr += f"Command not found: {first_cmd[0]}".encode()
-                return 127, b"", all_stderr
-
-            # Middle commands: input from previous temp file, output to next temp file
-            for i in range(1, len(parsed_commands) - 1):
-                cmd = parsed_commands[i]
-                cmd_path = shutil.which(cmd[0])
-                if cmd_path:
-                    cmd_args = [cmd_path] + cmd[1:]
-                    with open(temp_files[i - 1], "rb") as stdin_file, open(temp_files[i], "wb") as stdout_file:
-                        proc = await asyncio.create_subprocess_exec(
-                            *cmd_args,
-                            cwd=cwd,
-                            stdin=stdin_file,
-                            stdout=stdout_file,
-                            stderr=asyncio.subprocess.PIPE,
-                            env=merged_env,
-                        )
-                        _, stderr_i = await proc.communicate()
-                        all_stderr += stderr_i
-                else:
-                    all_stderr += f"Command not found: {cmd[0]}".encode()
-                    return 127, b"", all_stderr
-
-            # Last command: input from last temp file, output to pipe
-            last_cmd = parsed_commands[-1]
-            cmd_path = shutil.which(last_cmd[0])
-            if cmd_path:
-                last_cmd_args = [cmd_path] + last_cmd[1:]
-                with open(temp_files[-1], "rb") as last_in:
-                    last_proc = await asyncio.create_subprocess_exec(
-                        *last_cmd_args,
+            # Launch every stage up-front, wiring neighbouring stages together with kernel pipes
+            for i, cmd in enumerate(parsed_commands):
+                is_last = i == len(parsed_commands) - 1
+                next_read, write_end = (None, None) if is_last else os.pipe()
+                try:
+                    proc = await asyncio.create_subprocess_exec(
+                        *cmd,
+                        executable=_resolve_executable(cmd[0], merged_env),
                         cwd=cwd,
-                        stdin=last_in,
-                        stdout=asyncio.subprocess.PIPE,
+                        stdin=asyncio.subprocess.DEVNULL if prev_read is None else prev_read,
+                        stdout=asyncio.subprocess.PIPE if is_last else write_end,
                         stderr=asyncio.subprocess.PIPE,
                         env=merged_env,
+                        limit=_STREAM_LIMIT,
                     )
+                finally:
+                    # Drop the parent's copies so EOF and SIGPIPE propagate between stages
+                    if prev_read is not None:
+                        os.close(prev_read)
+                    if write_end is not None:
+                        os.close(write_end)
+                    prev_read = next_read
+                procs.append(proc)
+
+            # Await every stage together so each one's stderr is drained while the pipeline runs
+            results = await asyncio.gather(*(proc.communicate() for proc in procs))
+            return procs[-1].returncode, results[-1][0], b"".join(stderr for _, stderr in results)
 
-                    final_stdout, final_stderr = await last_proc.communicate()
-                    all_stderr += final_stderr
-                    return last_proc.returncode or 0, final_stdout, all_stderr
-            else:
-                return 127, b"", all_stderr + f"Command not found: {last_cmd[0]}".encode()
-
+        except FileNotFoundError:
+            return 127, b"", _NOT_FOUND + os.fsencode(cmd[0])
         except Exception as e:
             return 1, b"", str(e).encode()
 
         finally:
-            # Clean up temp files
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-                except Exception:
-                    pass
-
-    async def _aexecute_list_node(self, node: Any, env: dict[str, str], cwd: str | None = None) -> tuple[int, bytes, bytes]:
+            if prev_read is not None:
+                os.close(prev_read)
+            # Reap stages left running by a failed launch
+            for proc in procs:
+                if proc.returncode is None:
+                    try:
+                        proc.kill()
+                    except ProcessLookupError:
+                        pass
+                    await proc.wait()
+
+    async def _aexecute_list(self, plan: ListPlan | SequencePlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None = None) -> tuple[int, bytes, bytes]:
         """Execute a list of commands (cmd1; cmd2 or cmd1 && cmd2 or cmd1 || cmd2) asynchronously"""
-        if not hasattr(node, 'parts') or len(node.parts) < 3:
-            return 1, b"", b"Invalid list node structure"
-
-        left_node = node.parts[0]
-        operator = node.parts[1]
-        right_node = node.parts[2]
-
-        # Execute left command
-        left_rc, left_stdout, left_stderr = await self._aexecute_node(left_node, env, cwd)
-
-        # Check operator and decide whether to execute right command
-        if operator == '&&':
-            # AND operator: execute right only if left succeeded
-            if left_rc == 0:
-                right_rc, right_stdout, right_stderr = await self._aexecute_node(right_node, env, cwd)
-                # For && operator, we return right's return code and concatenate outputs
-                return right_rc, left_stdout + b"\n" + right_stdout if left_stdout and right_stdout else left_stdout + right_stdout, left_stderr + right_stderr
-            else:
-                return left_rc, left_stdout, left_stderr
-
-        elif operator == '||':
-            # OR operator: execute right only if left failed
-            if left_rc != 0:
-                right_rc, right_stdout, right_stderr = await self._aexecute_node(right_node, env, cwd)
-                # For || operator, we return right's return code and append its output
-                return right_rc, right_stdout, left_stderr + right_stderr
-            else:
-                return left_rc, left_stdout, left_stderr
-
-        elif operator == ';':
-            # SEMICOLON operator: always execute both
-            right_rc, right_stdout, right_stderr = await self._aexecute_node(right_node, env, cwd)
-            # For ; operator, we return right's return code and concatenate outputs
-            return right_rc, left_stdout + b"\n" + right_stdout if left_stdout and right_stdout else left_stdout + right_stdout, left_stderr + right_stderr
-
-        else:
-            return left_rc, left_stdout, left_stderr
+        all_stdout = bytearray()
+        all_stderr = bytearray()
+        last_rc = 0
+        # A SequencePlan is a ;-only chain, so pair every child with ';' and nothing short-circuits
+        steps = plan.steps if type(plan) is ListPlan else zip(repeat(';'), plan.children)
+
+        for operator, child in steps:
+            # && runs only after success, || only after failure; a skipped command keeps the previous rc
+            if (operator == '&&' and last_rc != 0) or (operator == '||' and last_rc == 0):
+                continue
+
+            last_rc, stdout, stderr = await self._run_async(child, env, merged_env, cwd)
+            # Keep each command's output on its own line
+            if stdout and all_stdout and not all_stdout.endswith(_NL):
+                all_stdout.extend(_NL)
+            all_stdout.extend(stdout)
+            all_stderr.extend(stderr)
+
+        return last_rc, bytes(all_stdout), bytes(all_stderr)
+
+    async def _aexecute_sequence(self, plan: SequencePlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None = None) -> tuple[int, bytes, bytes]:
+        """Execute ;-separated commands (cmd1; cmd2; ...) asynchronously, concurrently with parallel_list"""
+        if not self.parallel_list:
+            return await self._aexecute_list(plan, env, merged_env, cwd)
+
+        all_stdout = bytearray()
+        all_stderr = bytearray()
+        last_rc = 0
+
+        # Independent ;-separated commands: run them concurrently, then stitch outputs in order
+        results = await asyncio.gather(*(self._run_async(child, env, merged_env, cwd) for child in plan.children))
+        for last_rc, stdout, stderr in results:
+            # Keep each command's output on its own line
+            if stdout and all_stdout and not all_stdout.endswith(_NL):
+                all_stdout.extend(_NL)
+            all_stdout.extend(stdout)
+            all_stderr.extend(stderr)
+
+        return last_rc, bytes(all_stdout), bytes(all_stderr)
+
+    async def _aexecute_shell(self, plan: ShellPlan, env: dict[str, str] | None, merged_env: dict[str, str] | None, cwd: str | None = None) -> tuple[int, bytes, bytes]:
+        """Execute a subshell, group or unplannable command by invoking bash once on its source asynchronously"""
+        return await self._aexecute_argv(['bash', '-c', plan.source], merged_env, cwd)
+
+    # Async counterpart of _DISPATCH; handlers are coroutine functions returning (rc, stdout, stderr)
+    _ADISPATCH: ClassVar[dict[type, Callable[..., Awaitable[tuple[int, bytes, bytes]]]]] = {
+        CommandPlan: _aexecute_command,
+        PipelinePlan: _aexecute_pipeline,
+        ListPlan: _aexecute_list,
+        SequencePlan: _aexecute_sequence,
+        ShellPlan: _aexecute_shell,
+        UnsupportedPlan: _aexecute_unsupported,
+    }
 
 
-s = SecExec()
-print(s.execute("echo 'hi\nhello\nsyscl said hi'|grep hi|wc -l"))
-print(s.execute("echo 1 && echo 2 && echo 3 && echo 4 && echo 5"))
-
 # Async example
 async def run_async_example():
     s_async = SecExec()
@@ -686,5 +688,10 @@ async def run_async_example():
     print(s_async.execute(another_cmd))
 
 if __name__ == "__main__":
+    # Sync examples, only when run as a script so importing the library spawns nothing
+    s = SecExec()
+    print(s.execute("echo 'hi\nhello\nsyscl said hi'|grep hi|wc -l"))
+    print(s.execute("echo 1 && echo 2 && echo 3 && echo 4 && echo 5"))
+
     # Run the async example
     asyncio.run(run_async_example())
@@ -3,11 +3,13 @@ import asyncio
 import subprocess
 import os
 import sys
+import tempfile
+import time
 from pathlib import Path
 
 # Add the parent directory to sys.path to import secexec
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.secexec.secexec import SecExec
+from src.secexec.secexec import SecExec, CommandPlan, ListPlan, PipelinePlan, SequencePlan, _parse_cached, _which_cached
 
 
 class TestSecExec(unittest.TestCase):
@@ -75,6 +77,35 @@ class TestSecExec(unittest.TestCase):
         self.assertEqual(secexec_result[0].strip(), bash_stdout.strip())
         self.assertEqual(secexec_result[2], bash_rc)
     
+    def test_pipeline_large_stream(self):
+        """Test pipeline streaming more data than a single pipe buffer holds"""
+        command = "seq 1 200000 | grep 0 | tail -n 1"
+        secexec_result = self.secexec.execute(command)
+        bash_stdout, bash_stderr, bash_rc = self.run_bash_command(command)
+        
+        self.assertEqual(secexec_result[0].strip(), bash_stdout.strip())
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    def test_pipeline_upstream_stderr(self):
+        """Test stderr from an upstream pipeline stage is collected"""
+        command = "ls /thisdirectorydoesnotexist | wc -l"
+        secexec_result = self.secexec.execute(command)
+        bash_stdout, bash_stderr, bash_rc = self.run_bash_command(command)
+        
+        self.assertEqual(secexec_result[0].strip(), bash_stdout.strip())
+        self.assertEqual(secexec_result[2], bash_rc)
+        self.assertIn("thisdirectorydoesnotexist", secexec_result[1])
+        # argv[0] stays the name as typed even though the executable is resolved
+        self.assertTrue(secexec_result[1].startswith("ls:"))
+    
+    def test_pipeline_command_not_found(self):
+        """Test a missing command inside a pipeline"""
+        command = "echo 'x' | thiscommanddoesnotexist | cat"
+        secexec_result = self.secexec.execute(command)
+        
+        self.assertEqual(secexec_result[2], 127)
+        self.assertIn("Command not found: thiscommanddoesnotexist", secexec_result[1])
+    
     def test_and_operator(self):
         """Test AND operator (cmd1 && cmd2)"""
         command = "echo 'first' && echo 'second'"
@@ -122,6 +153,78 @@ class TestSecExec(unittest.TestCase):
         self.assertEqual(self.normalize_output(secexec_result[0]), self.normalize_output(bash_stdout))
         self.assertEqual(secexec_result[2], bash_rc)
     
+    def test_quoted_operators(self):
+        """Test operators inside quotes are passed through as arguments"""
+        command = "echo 'a && b || c; d'"
+        secexec_result = self.secexec.execute(command)
+        bash_stdout, bash_stderr, bash_rc = self.run_bash_command(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    def test_mixed_operator_chain(self):
+        """Test a chain mixing &&, || and ; follows shell short-circuit rules"""
+        command = "false && echo 'skipped' || echo 'recovered'; echo 'always'"
+        secexec_result = self.secexec.execute(command)
+        bash_stdout, bash_stderr, bash_rc = self.run_bash_command(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    def test_brace_group(self):
+        """Test grouped commands with braces"""
+        command = "{ echo 'a'; echo 'b'; } && echo 'c'"
+        secexec_result = self.secexec.execute(command)
+        bash_stdout, bash_stderr, bash_rc = self.run_bash_command(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    def test_pipeline_subshell_stages(self):
+        """Test subshell stages at either end of a pipeline"""
+        for command in ["echo a | (tr a b)", "(echo x; echo y) | sort -r"]:
+            secexec_result = self.secexec.execute(command)
+            bash_stdout, bash_stderr, bash_rc = self.run_bash_command(command)
+            
+            self.assertEqual(secexec_result[0], bash_stdout)
+            self.assertEqual(secexec_result[2], bash_rc)
+    
+    def test_negated_pipeline(self):
+        """Test ! negation is honoured rather than dropped"""
+        command = "! true && echo 'yes'"
+        secexec_result = self.secexec.execute(command)
+        bash_stdout, bash_stderr, bash_rc = self.run_bash_command(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+        self.assertEqual(secexec_result[2], 1)
+    
+    def test_subshell_side_effects(self):
+        """Test a subshell keeps its cd and redirect semantics"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            command = "(cd / && pwd) && pwd && (echo 'saved') > out.txt && cat out.txt"
+            secexec_result = self.secexec.execute(command, cwd=tmpdir)
+            bash_result = subprocess.run(['bash', '-c', command], cwd=tmpdir, capture_output=True, text=True)
+            
+            self.assertEqual(secexec_result[0], bash_result.stdout)
+            self.assertEqual(secexec_result[2], bash_result.returncode)
+    
+    def test_bash_only_syntax_runs_in_bash(self):
+        """Test functions and parenthesised syntax bashlex cannot plan still match bash"""
+        commands = [
+            "f() { echo x; }; f",
+            "function g { echo z; }; g && echo done",
+            "arr=(a b); echo ${arr[1]}",
+            "case a in (a) echo y;; esac",
+            "[[ (a == a) ]] && echo y",
+        ]
+        for command in commands:
+            secexec_result = self.secexec.execute(command)
+            bash_stdout, bash_stderr, bash_rc = self.run_bash_command(command)
+            
+            self.assertEqual(secexec_result[0], bash_stdout, command)
+            self.assertEqual(secexec_result[2], bash_rc, command)
+    
     def test_command_not_found(self):
         """Test handling of command not found"""
         command = "thiscommanddoesnotexist"
@@ -130,6 +233,31 @@ class TestSecExec(unittest.TestCase):
         self.assertNotEqual(secexec_result[2], 0)
         self.assertIn("Command not found", secexec_result[1])
     
+    def test_signal_terminated_command(self):
+        """Test a command killed by a signal reports a negative return code"""
+        command = "sh -c 'kill -KILL $$'"
+        secexec_result = self.secexec.execute(command)
+        
+        self.assertEqual(secexec_result[2], -9)
+    
+    def test_undecoded_output(self):
+        """Test decode=False returns raw bytes"""
+        command = "echo 'raw' && echo 'bytes'"
+        secexec_result = self.secexec.execute(command, decode=False)
+        
+        self.assertIsInstance(secexec_result[0], bytes)
+        self.assertIsInstance(secexec_result[1], bytes)
+        self.assertEqual(self.normalize_output(secexec_result[0].decode()), "raw bytes")
+        self.assertEqual(secexec_result[2], 0)
+    
+    def test_invalid_utf8_output_replaced(self):
+        """Test undecodable output bytes are replaced instead of raising"""
+        command = "printf 'ok\\377\\n'"
+        secexec_result = self.secexec.execute(command)
+        
+        self.assertEqual(secexec_result[0], "ok\ufffd\n")
+        self.assertEqual(secexec_result[2], 0)
+    
     def test_edge_case_empty_command(self):
         """Test edge case with empty command"""
         command = ""
@@ -158,6 +286,76 @@ class TestSecExec(unittest.TestCase):
         self.assertEqual(self.normalize_output(secexec_result[0]), "test_value")
         self.assertEqual(secexec_result[2], 0)
 
+    def test_env_variables_overlapping_names(self):
+        """Test variable names that prefix one another expand independently"""
+        env = {"PRE": "short", "PREFIX": "long"}
+        command = "echo $PREFIX ${PRE}x $UNSET_SECEXEC_VAR"
+        secexec_result = self.secexec.execute(command, env=env)
+        
+        self.assertEqual(self.normalize_output(secexec_result[0]), "long shortx $UNSET_SECEXEC_VAR")
+        self.assertEqual(secexec_result[2], 0)
+
+    def test_parse_cache_reused(self):
+        """Test repeated commands reuse the cached parse tree"""
+        _parse_cached.cache_clear()
+        command = "echo cached | cat"
+        first = self.secexec.execute(command)
+        second = self.secexec.execute(command)
+        
+        self.assertEqual(first, second)
+        self.assertEqual(_parse_cached.cache_info().hits, 1)
+
+    def test_which_cache_reused(self):
+        """Test repeated command names reuse the cached PATH resolution"""
+        _which_cached.cache_clear()
+        secexec_result = self.secexec.execute("echo one | cat | cat")
+        
+        self.assertEqual(secexec_result[0].strip(), "one")
+        self.assertEqual(_which_cached.cache_info().hits, 1)
+
+    def test_parse_builds_plan_tree(self):
+        """Test parsing yields argv-level plans with operators paired to their commands"""
+        plans = _parse_cached("echo a && echo $HOME | wc -l")
+        
+        self.assertEqual(plans, (ListPlan((
+            (';', CommandPlan(('echo', 'a'), False)),
+            ('&&', PipelinePlan((CommandPlan(('echo', '$HOME'), True), CommandPlan(('wc', '-l'), False)))),
+        )),))
+
+    def test_semicolon_chain_runs_as_sequence(self):
+        """Test a pure ;-chain is planned as a flat sequence and runs every command"""
+        command = "echo one; false; echo three"
+        plans = _parse_cached(command)
+        secexec_result = self.secexec.execute(command)
+        
+        self.assertIsInstance(plans[0], SequencePlan)
+        self.assertEqual(len(plans[0].children), 3)
+        self.assertEqual(self.normalize_output(secexec_result[0]), "one three")
+        self.assertEqual(secexec_result[2], 0)
+
+    def test_multiline_command_parses_every_line(self):
+        """Test newline-separated commands all run, not just the first"""
+        secexec_result = self.secexec.execute("echo first\necho second | cat")
+        
+        self.assertEqual(self.normalize_output(secexec_result[0]), "first second")
+        self.assertEqual(secexec_result[2], 0)
+
+    def test_plain_command_skips_parser(self):
+        """Test a command without shell metacharacters runs without being parsed"""
+        _parse_cached.cache_clear()
+        secexec_result = self.secexec.execute("echo plain   args here")
+        
+        self.assertEqual(secexec_result, ("plain args here\n", "", 0))
+        self.assertEqual(_parse_cached.cache_info().misses, 0)
+
+    def test_leading_assignment_not_fast_pathed(self):
+        """Test a leading NAME=value word goes through the parser instead of being run as a command"""
+        _parse_cached.cache_clear()
+        secexec_result = self.secexec.execute("SECEXEC_ASSIGN=1 echo assigned")
+        
+        self.assertEqual(secexec_result, ("assigned\n", "", 0))
+        self.assertEqual(_parse_cached.cache_info().misses, 1)
+
     def normalize_output(self, output):
         """Normalize output by stripping whitespace and joining lines for comparison"""
         if not output:
@@ -187,6 +385,23 @@ class TestSecExecAsync(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(secexec_result[0].strip(), bash_stdout.strip())
         self.assertEqual(secexec_result[2], bash_rc)
     
+    async def test_async_pipeline_large_stream(self):
+        """Test pipeline streaming more data than a single pipe buffer holds asynchronously"""
+        command = "seq 1 200000 | grep 0 | tail -n 1"
+        secexec_result = await self.secexec.aexecute(command)
+        bash_stdout, bash_stderr, bash_rc = await self.run_bash_command_async(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    async def test_async_pipeline_command_not_found(self):
+        """Test a missing command inside a pipeline asynchronously"""
+        command = "echo 'x' | thiscommanddoesnotexist | cat"
+        secexec_result = await self.secexec.aexecute(command)
+        
+        self.assertEqual(secexec_result[2], 127)
+        self.assertIn("Command not found", secexec_result[1])
+    
     async def test_async_and_operator(self):
         """Test AND operator asynchronously"""
         command = "echo 'async1' && echo 'async2'"
@@ -196,6 +411,64 @@ class TestSecExecAsync(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(self.normalize_output(secexec_result[0]), self.normalize_output(bash_stdout))
         self.assertEqual(secexec_result[2], bash_rc)
     
+    async def test_async_or_operator_chain(self):
+        """Test OR chain with subshell asynchronously"""
+        command = "false || (false || echo 'fallback')"
+        secexec_result = await self.secexec.aexecute(command)
+        bash_stdout, bash_stderr, bash_rc = await self.run_bash_command_async(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    async def test_async_subshell_side_effects(self):
+        """Test a subshell keeps its cd semantics asynchronously"""
+        command = "(cd / && pwd) && echo 'done'"
+        secexec_result = await self.secexec.aexecute(command)
+        bash_stdout, bash_stderr, bash_rc = await self.run_bash_command_async(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    async def test_async_function_definition(self):
+        """Test a function defined and called in one command asynchronously"""
+        command = "f() { echo x; }; f"
+        secexec_result = await self.secexec.aexecute(command)
+        bash_stdout, bash_stderr, bash_rc = await self.run_bash_command_async(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    async def test_async_parallel_list(self):
+        """Test ;-separated commands run concurrently keep their output order"""
+        secexec = SecExec(parallel_list=True)
+        command = "sleep 0.2; echo 'first'; echo 'second'; false"
+        secexec_result = await secexec.aexecute(command)
+        bash_stdout, bash_stderr, bash_rc = await self.run_bash_command_async(command)
+        
+        self.assertEqual(secexec_result[0], bash_stdout)
+        self.assertEqual(secexec_result[2], bash_rc)
+    
+    async def test_async_parallel_list_runs_concurrently(self):
+        """Test ;-separated commands overlap in time with parallel_list enabled"""
+        command = "sleep 0.3; sleep 0.3; sleep 0.3"
+        elapsed = {}
+        for parallel in (False, True):
+            start = time.monotonic()
+            secexec_result = await SecExec(parallel_list=parallel).aexecute(command)
+            elapsed[parallel] = time.monotonic() - start
+            self.assertEqual(secexec_result[2], 0)
+        
+        # Sequential runs take three sleeps and parallel runs about one; compare rather than use a fixed bound
+        self.assertLess(elapsed[True], elapsed[False] * 0.7)
+    
+    async def test_async_env_variables(self):
+        """Test environment variable handling asynchronously"""
+        env = {"TEST_VAR": "test_value"}
+        secexec_result = await self.secexec.aexecute("echo $TEST_VAR | cat", env=env)
+        
+        self.assertEqual(self.normalize_output(secexec_result[0]), "test_value")
+        self.assertEqual(secexec_result[2], 0)
+    
     async def test_async_complex_command(self):
         """Test complex command asynchronously"""
         command = "echo 'line1\nline2\nline3' | grep line | sort | uniq"
@@ -205,6 +478,21 @@ class TestSecExecAsync(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(secexec_result[0].strip(), bash_stdout.strip())
         self.assertEqual(secexec_result[2], bash_rc)
     
+    async def test_async_undecoded_output(self):
+        """Test decode=False returns raw bytes asynchronously"""
+        command = "echo 'raw' | cat"
+        secexec_result = await self.secexec.aexecute(command, decode=False)
+        
+        self.assertEqual(secexec_result[0], b"raw\n")
+        self.assertEqual(secexec_result[2], 0)
+    
+    async def test_async_signal_terminated_command(self):
+        """Test a command killed by a signal reports a negative return code asynchronously"""
+        command = "sh -c 'kill -KILL $$'"
+        secexec_result = await self.secexec.aexecute(command)
+        
+        self.assertEqual(secexec_result[2], -9)
+    
     def normalize_output(self, output):
         """Normalize output by stripping whitespace and joining lines for comparison"""
         if not output: